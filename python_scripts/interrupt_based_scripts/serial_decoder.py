@@ -1,100 +1,300 @@
-import csv
+import mmap
 import sys
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pac
+except ImportError:
+    # PyArrow is optional - ingest falls back to the pandas C parser
+    pa = None
+    pac = None
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional - decoding still works, just without the JIT speedup
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+def load_transitions(filepath):
+    """Load a capture CSV into per-channel (times, levels) transition arrays
+
+    Prefers the multithreaded PyArrow CSV reader, which parses straight
+    into typed columnar buffers and converts to NumPy without a copy;
+    falls back to the pandas C parser when pyarrow is not installed.
+
+    The whole capture is sorted by time once during ingest (a single C
+    argsort on the int64 column), so every returned channel's arrays are
+    already time-sorted and decoders must not re-sort them.
+    """
+    if pac is not None:
+        return _load_transitions_arrow(filepath)
+    return _load_transitions_pandas(filepath)
+
+def _load_transitions_arrow(filepath):
+    """PyArrow ingest path: dictionary-encoded channel/edge, int64 timestamps
+
+    The file is memory-mapped and handed to the parser as a zero-copy
+    buffer, so the OS pages it in lazily instead of read() copying the
+    whole capture through userspace first.
+    """
+    with open(filepath, 'rb') as f:
+        # The py_buffer exports a pointer into the mapping, so the mmap is
+        # left to close with its last reference rather than eagerly
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        table = pac.read_csv(
+            pa.py_buffer(mm),
+            read_options=pac.ReadOptions(column_names=['channel', 'edge', 'timestamp'],
+                                         skip_rows=1),
+            # A torn final row is the normal end state of bitlog.csv (the
+            # plotter's writer thread dies with the window), so skip
+            # malformed rows like the row-by-row parser did
+            parse_options=pac.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+            # Timestamps stay inferred so a garbage field falls back to
+            # string inference instead of raising ArrowInvalid mid-parse
+            convert_options=pac.ConvertOptions(column_types={
+                'channel': pa.dictionary(pa.int32(), pa.string()),
+                'edge': pa.dictionary(pa.int32(), pa.string())})).combine_chunks()
+
+    if table.num_rows == 0:
+        return {}
+
+    ts_col = table.column('timestamp')
+    if pa.types.is_integer(ts_col.type) and ts_col.null_count == 0:
+        times = ts_col.to_numpy()
+        valid = None
+    else:
+        # Mirror the old per-row int() guard (and the pandas fallback):
+        # coerce the column and drop rows whose timestamp doesn't parse
+        coerced = pd.to_numeric(ts_col.to_pandas(), errors='coerce').to_numpy(np.float64)
+        valid = ~np.isnan(coerced)
+        times = coerced[valid].astype(np.int64)
+        if times.size == 0:
+            return {}
+
+    chan_col = table.column('channel').chunk(0)
+    chan_codes = chan_col.indices.to_numpy()
+    chan_names = chan_col.dictionary.to_pylist()
+    edge_col = table.column('edge').chunk(0)
+
+    # One string compare per distinct edge label, not per row
+    edge_is_rising = np.asarray([e.lower() == 'rising' for e in edge_col.dictionary.to_pylist()],
+                                dtype=np.uint8)
+    levels = edge_is_rising[edge_col.indices.to_numpy()]
+    if valid is not None:
+        chan_codes = chan_codes[valid]
+        levels = levels[valid]
+
+    # One groupby-split: sort by (channel, time) and slice at the
+    # channel boundaries, giving per-channel time-sorted views
+    order = np.lexsort((times, chan_codes))
+    times = times[order]
+    levels = levels[order]
+    chan_codes = chan_codes[order]
+
+    boundaries = np.flatnonzero(np.diff(chan_codes)) + 1
+    group_codes = chan_codes[np.concatenate(([0], boundaries))]
+
+    channel_data = {}
+    for code, group_times, group_levels in zip(group_codes.tolist(),
+                                               np.split(times, boundaries),
+                                               np.split(levels, boundaries)):
+        channel_data[chan_names[code]] = (group_times, group_levels)
+    return channel_data
+
+def _load_transitions_pandas(filepath):
+    """Fallback ingest path using the pandas C parser"""
+    df = pd.read_csv(filepath, header=0, names=['channel', 'edge', 'timestamp'],
+                     dtype={'channel': 'category', 'edge': 'category'})
+    df['timestamp'] = pd.to_numeric(df['timestamp'], errors='coerce')
+    df = df.dropna(subset=['timestamp'])
+
+    # One string compare per distinct edge label, not per row
+    edge_is_rising = np.asarray([str(c).lower() == 'rising' for c in df['edge'].cat.categories],
+                                dtype=np.uint8)
+    df['level'] = edge_is_rising[df['edge'].cat.codes.to_numpy()]
+    df['timestamp'] = df['timestamp'].astype(np.int64)
+    df = df.sort_values('timestamp', kind='stable')
+
+    channel_data = {}
+    for channel, group in df.groupby('channel', observed=True, sort=False):
+        channel_data[str(channel)] = (group['timestamp'].to_numpy(np.int64),
+                                      group['level'].to_numpy(np.uint8))
+    return channel_data
+
+# Placeholder for channels missing from a capture
+_NO_TRANSITIONS = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8))
+
+def with_idle_state(times, levels, idle_level=1):
+    """Prepend the idle line state to a channel's transition arrays
+
+    Returns (times, levels) copies where levels[i] is the line state right
+    after times[i], with the idle state prepended so lookups before the
+    first edge return idle_level.
+    """
+    n = times.size
+    full_times = np.empty(n + 1, dtype=np.int64)
+    full_levels = np.empty(n + 1, dtype=np.uint8)
+    full_times[0] = np.iinfo(np.int64).min
+    full_levels[0] = idle_level
+    full_times[1:] = times
+    full_levels[1:] = levels
+    return full_times, full_levels
+
+def format_bytes(byte_vals):
+    """Format a uint8 array as (space-separated hex, printable ASCII) strings
+
+    Both conversions run in C (bytes.hex and a vectorized printable mask)
+    instead of a per-byte Python format loop.
+    """
+    byte_vals = np.ascontiguousarray(byte_vals, dtype=np.uint8)
+    hex_str = byte_vals.tobytes().hex(' ').upper()
+    printable = np.where((byte_vals >= 32) & (byte_vals < 127), byte_vals, ord('.'))
+    ascii_str = printable.astype(np.uint8).tobytes().decode('latin-1')
+    return hex_str, ascii_str
+
+def get_line_level_at(times, levels, sample_time):
+    """Get the logic level at a specific time via binary search
+
+    times/levels must come from with_idle_state so lookups before the
+    first edge resolve to the idle level.
+    """
+    return int(levels[np.searchsorted(times, sample_time, side='right') - 1])
+
+@njit(cache=True)
+def _sample_levels(times, levels, sample_times):
+    """JIT-compiled batched line-state lookup on sorted timestamp arrays"""
+    idx = np.searchsorted(times, sample_times, side='right') - 1
+    return levels[np.maximum(idx, 0)]
+
+def get_levels_at(times, levels, sample_times):
+    """Vectorized form of get_line_level_at for a whole array of sample times"""
+    return _sample_levels(times, levels, sample_times)
 
 # ========== UART DECODER ==========
-def get_line_level_at(transitions, sample_time):
-    """Get the logic level at a specific time based on transitions"""
-    level = 1  # UART idle line is high
-    for edge, t in transitions:
-        if t > sample_time:
-            break
-        if edge == 'falling':
-            level = 0
-        elif edge == 'rising':
-            level = 1
-    return level
-
-def detect_uart_frames(transitions, bit_time_us):
+
+def detect_uart_frames(times, levels, bit_time_us, data_bits=8, stop_bits=1):
     """
     Improved UART frame detection that handles inter-character gaps properly
+
+    Once a start bit is accepted, candidates inside the decoded frame are
+    skipped so data-bit edges are not misread as new start bits.
     """
-    frames = []
     min_start_width = bit_time_us * 0.5  # Start bit must be at least 50% of bit time
     min_idle_time = bit_time_us * 0.8    # Minimum idle time between frames
-    
+
+    falling_idx = np.flatnonzero(levels == 0)
+    rising_idx = np.flatnonzero(levels == 1)
+
+    if falling_idx.size == 0 or rising_idx.size == 0:
+        return []
+
+    # Reject falling edges that follow another falling edge too closely
+    # (line was not idle long enough for a new frame)
+    prev_is_falling = (falling_idx > 0) & (levels[np.maximum(falling_idx - 1, 0)] == 0)
+    prev_gap = times[falling_idx] - times[np.maximum(falling_idx - 1, 0)]
+    not_idle = prev_is_falling & (prev_gap < min_idle_time)
+
+    # For each falling edge, find the next rising edge and check start-bit width
+    next_rising_pos = np.searchsorted(rising_idx, falling_idx)
+    has_rising = next_rising_pos < rising_idx.size
+    start_bit_width = np.where(
+        has_rising,
+        times[rising_idx[np.minimum(next_rising_pos, rising_idx.size - 1)]] - times[falling_idx],
+        -1)
+
+    valid = ~not_idle & has_rising & (start_bit_width >= min_start_width)
+    candidate_times = times[falling_idx[valid]]
+
+    # Accept candidates left to right, jumping past each decoded frame
+    frame_span = bit_time_us * (1.5 + data_bits + stop_bits)
+    frames = []
     i = 0
-    while i < len(transitions):
-        edge, time = transitions[i]
-        
-        # Look for falling edge (potential start bit)
-        if edge != 'falling':
-            i += 1
-            continue
-            
-        # Check if line was idle (high) for sufficient time before this falling edge
-        if i > 0:
-            prev_edge, prev_time = transitions[i-1]
-            if prev_edge == 'falling' and (time - prev_time) < min_idle_time:
-                i += 1
-                continue
-        
-        # Find the next rising edge to measure start bit width
-        start_bit_end = None
-        for j in range(i + 1, len(transitions)):
-            next_edge, next_time = transitions[j]
-            if next_edge == 'rising':
-                start_bit_width = next_time - time
-                if start_bit_width >= min_start_width:
-                    start_bit_end = next_time
-                    frames.append(time)
-                break
-        
-        i += 1
-    
+    while i < candidate_times.size:
+        start_time = int(candidate_times[i])
+        frames.append(start_time)
+        i = int(np.searchsorted(candidate_times, start_time + frame_span, side='left'))
     return frames
 
-def decode_uart_frame(transitions, start_time, bit_time_us, data_bits=8, parity='N'):
+@njit(cache=True)
+def _uart_core(times, levels, starts, bit_offsets, parity_offset, stop_offset, parity_mode):
     """
-    Decode a single UART frame starting at start_time
+    Decode all UART frames in one JIT-compiled pass
+
+    bit_offsets/parity_offset/stop_offset are precomputed sample-time
+    offsets from the frame start. parity_mode: 0 = none, 1 = even,
+    2 = odd. Returns per-frame byte values, parity-ok flags and sampled
+    stop bits.
     """
-    
-    # Sample data bits at the center of each bit period
-    bits = []
-    for bit_index in range(data_bits):
-        sample_time = start_time + int(bit_time_us * (1.5 + bit_index))
-        bit_value = get_line_level_at(transitions, sample_time)
-        bits.append(bit_value)
-    
-    # Handle parity bit if enabled
-    parity_bit = None
-    parity_ok = True
-    if parity.upper() in ('E', 'O'):
-        parity_sample_time = start_time + int(bit_time_us * (1.5 + data_bits))
-        parity_bit = get_line_level_at(transitions, parity_sample_time)
-        
-        # Check parity
-        data_ones = sum(bits)
-        if parity.upper() == 'E':  
-            parity_ok = (data_ones % 2) == (1 - parity_bit)
-        else:  
-            parity_ok = (data_ones % 2) == parity_bit
-            
-        if not parity_ok:
-            print(f"  WARNING: Parity error!")
-    
-    # Check stop bit(s)
-    stop_sample_time = start_time + int(bit_time_us * (1.5 + data_bits + (1 if parity != 'N' else 0)))
-    stop_bit = get_line_level_at(transitions, stop_sample_time)
-    if stop_bit != 1:
-        print(f"  WARNING: Stop bit error! Expected 1, got {stop_bit}")
-    
-    # Compose byte (LSB first for UART)
-    byte_value = 0
-    for idx, bit_val in enumerate(bits):
-        byte_value |= (bit_val << idx)
-        
-    return byte_value, parity_ok
+    n_frames = starts.shape[0]
+    data_bits = bit_offsets.shape[0]
+    byte_vals = np.zeros(n_frames, dtype=np.uint8)
+    parity_ok = np.ones(n_frames, dtype=np.uint8)
+    stop_bits = np.ones(n_frames, dtype=np.uint8)
+
+    # Hoisted LSB-first bit weights so byte composition is a branchless
+    # multiply-accumulate the compiler can vectorize
+    weights = np.empty(data_bits, dtype=np.uint32)
+    for k in range(data_bits):
+        weights[k] = 1 << k
+
+    for f in range(n_frames):
+        start_time = starts[f]
+
+        # Sample data bits at bit centers (LSB first for UART)
+        byte_value = np.uint32(0)
+        data_ones = 0
+        for k in range(data_bits):
+            idx = np.searchsorted(times, start_time + bit_offsets[k], side='right') - 1
+            bit = levels[idx]
+            byte_value += bit * weights[k]
+            data_ones += bit
+        byte_vals[f] = byte_value
+
+        # Parity bit if enabled
+        if parity_mode != 0:
+            idx = np.searchsorted(times, start_time + parity_offset, side='right') - 1
+            parity_bit = levels[idx]
+            if parity_mode == 1:
+                parity_ok[f] = 1 if (data_ones % 2) == (1 - parity_bit) else 0
+            else:
+                parity_ok[f] = 1 if (data_ones % 2) == parity_bit else 0
+
+        # Stop bit
+        idx = np.searchsorted(times, start_time + stop_offset, side='right') - 1
+        stop_bits[f] = levels[idx]
+
+    return byte_vals, parity_ok, stop_bits
+
+def decode_uart_channel(edge_times, edge_levels, bit_time_us, data_bits, parity_mode, stop_bits):
+    """
+    Decode one channel's transition arrays into UART bytes
+
+    Pure function (no printing or I/O) so independent channels can be
+    decoded in parallel worker processes.
+    """
+    frame_start_times = detect_uart_frames(edge_times, edge_levels, bit_time_us,
+                                           data_bits, stop_bits)
+    if not frame_start_times:
+        return [], None, None, None
+
+    times, levels = with_idle_state(edge_times, edge_levels)
+    starts = np.asarray(frame_start_times, dtype=np.int64)
+
+    # Precompute the shared sample-time schedule once per channel
+    bit_offsets = (bit_time_us * (1.5 + np.arange(data_bits))).astype(np.int64)
+    parity_offset = int(bit_time_us * (1.5 + data_bits))
+    stop_offset = int(bit_time_us * (1.5 + data_bits + (1 if parity_mode != 0 else 0)))
+
+    byte_vals, parity_flags, stop_bits_sampled = _uart_core(
+        times, levels, starts, bit_offsets, parity_offset, stop_offset, parity_mode)
+    return frame_start_times, byte_vals, parity_flags, stop_bits_sampled
 
 def decode_uart(filepath, baud_rate, data_bits=8, parity='N', stop_bits=1):
     """
@@ -103,27 +303,13 @@ def decode_uart(filepath, baud_rate, data_bits=8, parity='N', stop_bits=1):
     bit_time_us = 5_140_000 / baud_rate # set as needed based on resolution (5.14 MHz)
     
     # Read CSV file
-    channel_data = {}
     try:
         with open(filepath, 'r', newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            header = next(reader)
-            print(f"CSV header: {header}")
-            
-            for row in reader:
-                if len(row) != 3:
-                    continue
-                channel, edge, timestamp = row
-                try:
-                    timestamp = int(timestamp)
-                except ValueError:
-                    print(f"Warning: Invalid timestamp '{timestamp}' - skipping")
-                    continue
-                
-                if channel not in channel_data:
-                    channel_data[channel] = []
-                channel_data[channel].append((edge.lower(), timestamp))
-                
+            header = csvfile.readline().strip().split(',')
+        print(f"CSV header: {header}")
+
+        channel_data = load_transitions(filepath)
+
     except FileNotFoundError:
         print(f"Error: File '{filepath}' not found")
         return
@@ -131,34 +317,43 @@ def decode_uart(filepath, baud_rate, data_bits=8, parity='N', stop_bits=1):
         print(f"Error reading file: {e}")
         return
     
-    # Process each channel
-    for channel, transitions in channel_data.items():
-        
-        # Sort transitions by time
-        transitions.sort(key=lambda x: x[1])
-        
-        # Detect UART frames
-        frame_start_times = detect_uart_frames(transitions, bit_time_us)
-        
+    # Decode channels (transitions arrive time-sorted from ingest);
+    # independent channels decode in parallel across worker processes
+    parity_mode = {'E': 1, 'O': 2}.get(parity.upper(), 0)
+    channels = list(channel_data.keys())
+    if len(channels) > 1:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(
+                decode_uart_channel,
+                (channel_data[ch][0] for ch in channels),
+                (channel_data[ch][1] for ch in channels),
+                repeat(bit_time_us), repeat(data_bits),
+                repeat(parity_mode), repeat(stop_bits)))
+    else:
+        results = [decode_uart_channel(*channel_data[ch], bit_time_us, data_bits,
+                                       parity_mode, stop_bits)
+                   for ch in channels]
+
+    for channel, (frame_start_times, byte_vals, parity_flags, stop_bits_sampled) in zip(channels, results):
+
         if not frame_start_times:
             print("No valid UART frames detected!")
             continue
-        
-        # Decode each frame
-        decoded_bytes = []
-        for start_time in frame_start_times:
-            try:
-                byte_val, parity_ok = decode_uart_frame(transitions, start_time, bit_time_us, data_bits, parity)
-                decoded_bytes.append(byte_val)
-            except Exception as e:
-                print(f"Error decoding frame at {start_time}µs: {e}")
+
+        for i in range(len(frame_start_times)):
+            if parity_mode != 0 and not parity_flags[i]:
+                print(f"  WARNING: Parity error!")
+            if stop_bits_sampled[i] != 1:
+                print(f"  WARNING: Stop bit error! Expected 1, got {stop_bits_sampled[i]}")
+        decoded_bytes = byte_vals.tolist()
         
         # Output results
+        hex_str, ascii_str = format_bytes(byte_vals)
         print(f"\n{'='*20} Results for {channel} {'='*20}")
         print(f"Decoded {len(decoded_bytes)} bytes:")
-        print(f"Hex:   {' '.join(f'{b:02X}' for b in decoded_bytes)}")
-        print(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}")
-        
+        print(f"Hex:   {hex_str}")
+        print(f"ASCII: {ascii_str}")
+
         # Save to file
         output_file = f"{channel}_uart_decoded.txt"
         try:
@@ -167,8 +362,8 @@ def decode_uart(filepath, baud_rate, data_bits=8, parity='N', stop_bits=1):
                 f.write(f"Baud: {baud_rate}, Data: {data_bits}, Parity: {parity}, Stop: {stop_bits}\n")
                 f.write(f"Bit time: {bit_time_us:.2f}µs\n")
                 f.write("=" * 50 + "\n")
-                f.write(f"Hex:   {' '.join(f'{b:02X}' for b in decoded_bytes)}\n")
-                f.write(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}\n")
+                f.write(f"Hex:   {hex_str}\n")
+                f.write(f"ASCII: {ascii_str}\n")
             print(f"Results saved to: {output_file}")
         except Exception as e:
             print(f"Error saving file: {e}")
@@ -180,200 +375,136 @@ def decode_spi(csv_file, clock_polarity=0, clock_phase=0):
     clock_polarity: 0 = idle low, 1 = idle high
     clock_phase: 0 = sample on leading edge, 1 = sample on trailing edge
     """
-    transitions = defaultdict(list)
+    transitions = load_transitions(csv_file)
     output_lines = []
 
-    with open(csv_file, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip header
-        for row in reader:
-            if len(row) != 3:
-                continue
-            channel, edge, timestamp = row
-            try:
-                timestamp = int(timestamp)
-            except ValueError:
-                continue
-            transitions[channel].append((edge.lower(), timestamp))
-
-    # Sort all transitions by time
-    for channel in transitions:
-        transitions[channel].sort(key=lambda x: x[1])
-
     # Determine sampling edge based on polarity and phase
-    if clock_polarity == 0:  
+    if clock_polarity == 0:
         sample_edge = 'rising' if clock_phase == 0 else 'falling'
-    else:  
+    else:
         sample_edge = 'falling' if clock_phase == 0 else 'rising'
 
-    clk_edges = [t for e, t in transitions.get('SCK', []) if e == sample_edge]
-    mosi_transitions = transitions.get('MOSI', [])
-    miso_transitions = transitions.get('MISO', [])
-
-    print(f"Found {len(clk_edges)} clock edges for sampling")
-
-    mosi_byte = 0
-    miso_byte = 0
-    bit_count = 0
-
-    for clk_time in clk_edges:
-        # Find MOSI level at clock edge
-        mosi_level = 0
-        for e, t in reversed(mosi_transitions):
-            if t <= clk_time:
-                mosi_level = 1 if e == 'rising' else 0
-                break
-
-        # Find MISO level at clock edge
-        miso_level = 0
-        for e, t in reversed(miso_transitions):
-            if t <= clk_time:
-                miso_level = 1 if e == 'rising' else 0
-                break
-
-        # SPI is MSB first
-        mosi_byte = (mosi_byte << 1) | mosi_level
-        miso_byte = (miso_byte << 1) | miso_level
-        bit_count += 1
-
-        if bit_count == 8:
-            # Convert to ASCII characters if printable
-            mosi_char = chr(mosi_byte) if 32 <= mosi_byte < 127 else '.'
-            miso_char = chr(miso_byte) if 32 <= miso_byte < 127 else '.'
-            
-            output_lines.append(f"{clk_time}µs: SPI MOSI = 0x{mosi_byte:02X} ('{mosi_char}'), MISO = 0x{miso_byte:02X} ('{miso_char}')")
-            print(f"SPI byte at {clk_time}µs: MOSI=0x{mosi_byte:02X} ('{mosi_char}'), MISO=0x{miso_byte:02X} ('{miso_char}')")
-            mosi_byte = 0
-            miso_byte = 0
-            bit_count = 0
-
-    # Collect all MOSI and MISO bytes for ASCII representation
-    mosi_bytes = []
-    miso_bytes = []
-    for line in output_lines:
-        # Extract hex values from output lines
-        if 'MOSI = 0x' in line:
-            mosi_hex = line.split('MOSI = 0x')[1].split(' ')[0]
-            miso_hex = line.split('MISO = 0x')[1].split(' ')[0]
-            mosi_bytes.append(int(mosi_hex, 16))
-            miso_bytes.append(int(miso_hex, 16))
+    sck_times, sck_levels = transitions.get('SCK', _NO_TRANSITIONS)
+    clk_arr = sck_times[sck_levels == (1 if sample_edge == 'rising' else 0)]
+
+    print(f"Found {clk_arr.size} clock edges for sampling")
+
+    # Build searchable line-state arrays (lines idle low before first edge)
+    mosi_times, mosi_levels = with_idle_state(*transitions.get('MOSI', _NO_TRANSITIONS), idle_level=0)
+    miso_times, miso_levels = with_idle_state(*transitions.get('MISO', _NO_TRANSITIONS), idle_level=0)
+
+    # Sample both data lines at every clock edge in two batched lookups
+    mosi_at_clk = get_levels_at(mosi_times, mosi_levels, clk_arr)
+    miso_at_clk = get_levels_at(miso_times, miso_levels, clk_arr)
+
+    # Trim to whole bytes and pack (SPI is MSB first)
+    n_bits = (clk_arr.size // 8) * 8
+    byte_times = clk_arr[7:n_bits:8]
+    mosi_bytes_arr = np.packbits(mosi_at_clk[:n_bits].reshape(-1, 8), axis=1, bitorder='big').ravel()
+    miso_bytes_arr = np.packbits(miso_at_clk[:n_bits].reshape(-1, 8), axis=1, bitorder='big').ravel()
+
+    for clk_time, mosi_byte, miso_byte in zip(byte_times.tolist(),
+                                              mosi_bytes_arr.tolist(),
+                                              miso_bytes_arr.tolist()):
+        # Convert to ASCII characters if printable
+        mosi_char = chr(mosi_byte) if 32 <= mosi_byte < 127 else '.'
+        miso_char = chr(miso_byte) if 32 <= miso_byte < 127 else '.'
+
+        output_lines.append(f"{clk_time}µs: SPI MOSI = 0x{mosi_byte:02X} ('{mosi_char}'), MISO = 0x{miso_byte:02X} ('{miso_char}')")
+        print(f"SPI byte at {clk_time}µs: MOSI=0x{mosi_byte:02X} ('{mosi_char}'), MISO=0x{miso_byte:02X} ('{miso_char}')")
+
+    mosi_hex, mosi_ascii = format_bytes(mosi_bytes_arr)
+    miso_hex, miso_ascii = format_bytes(miso_bytes_arr)
 
     with open("decoded_spi_output.txt", "w") as f:
         f.write("=== SPI Decoded Data ===\n")
         for line in output_lines:
             f.write(line + "\n")
         f.write(f"\n=== ASCII Summary ===\n")
-        f.write(f"MOSI Hex: {' '.join(f'{b:02X}' for b in mosi_bytes)}\n")
-        f.write(f"MOSI ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in mosi_bytes)}\n")
-        f.write(f"MISO Hex: {' '.join(f'{b:02X}' for b in miso_bytes)}\n")
-        f.write(f"MISO ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in miso_bytes)}\n")
-    
+        f.write(f"MOSI Hex: {mosi_hex}\n")
+        f.write(f"MOSI ASCII: {mosi_ascii}\n")
+        f.write(f"MISO Hex: {miso_hex}\n")
+        f.write(f"MISO ASCII: {miso_ascii}\n")
+
     print(f"\nSPI ASCII Summary:")
-    print(f"MOSI: {''.join(chr(b) if 32 <= b < 127 else '.' for b in mosi_bytes)}")
-    print(f"MISO: {''.join(chr(b) if 32 <= b < 127 else '.' for b in miso_bytes)}")
+    print(f"MOSI: {mosi_ascii}")
+    print(f"MISO: {miso_ascii}")
     print(f"Decoded SPI output written to 'decoded_spi_output.txt'")
 
 # ========== I2C DECODER ==========
 def decode_i2c(csv_file):
-    transitions = defaultdict(list)
+    transitions = load_transitions(csv_file)
     output_lines = []
 
-    with open(csv_file, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip header
-        for row in reader:
-            if len(row) != 3:
-                continue
-            channel, edge, timestamp = row
-            try:
-                timestamp = int(timestamp)
-            except ValueError:
-                continue
-            transitions[channel].append((edge.lower(), timestamp))
-
-    # Sort transitions by time
-    for channel in transitions:
-        transitions[channel].sort(key=lambda x: x[1])
-
-    sda_transitions = transitions.get('SDA', [])
-    scl_transitions = transitions.get('SCL', [])
-
-    print(f"Found {len(sda_transitions)} SDA transitions, {len(scl_transitions)} SCL transitions")
-
-    # Detect start/stop conditions
-    start_stops = []
-    scl_high_periods = []
-    
-    # Find SCL high periods
-    scl_level = 0
-    scl_high_start = None
-    for edge, time in scl_transitions:
-        if edge == 'rising':
-            scl_level = 1
-            scl_high_start = time
-        elif edge == 'falling' and scl_level == 1:
-            scl_level = 0
-            if scl_high_start is not None:
-                scl_high_periods.append((scl_high_start, time))
+    sda_edge_times, sda_edge_levels = transitions.get('SDA', _NO_TRANSITIONS)
+    scl_edge_times, scl_edge_levels = transitions.get('SCL', _NO_TRANSITIONS)
+
+    print(f"Found {sda_edge_times.size} SDA transitions, {scl_edge_times.size} SCL transitions")
+
+    # Find SCL high periods: a falling edge closes a (rising, falling)
+    # interval when a rising edge occurred since the previous falling edge
+    scl_rising_idx = np.flatnonzero(scl_edge_levels == 1)
+    scl_falling_idx = np.flatnonzero(scl_edge_levels == 0)
+    pos = np.searchsorted(scl_rising_idx, scl_falling_idx) - 1
+    prev_falling = np.concatenate(([-1], scl_falling_idx[:-1]))
+    closes = (pos >= 0) & (scl_rising_idx[np.maximum(pos, 0)] > prev_falling)
+    scl_high_starts = scl_edge_times[scl_rising_idx[np.maximum(pos, 0)][closes]]
+    scl_high_ends = scl_edge_times[scl_falling_idx[closes]]
 
     # Detect start/stop conditions (SDA transitions while SCL is high)
-    for sda_edge, sda_time in sda_transitions:
-        for scl_start, scl_end in scl_high_periods:
-            if scl_start <= sda_time <= scl_end:
-                if sda_edge == 'falling':
-                    start_stops.append(('START', sda_time))
-                elif sda_edge == 'rising':
-                    start_stops.append(('STOP', sda_time))
-                break
-
-    # Sample data bits on SCL rising edges
-    bits = []
-    current_byte = 0
-    bit_count = 0
-    decoded_bytes = []
-
-    for edge, time in scl_transitions:
-        if edge == 'rising':
-            # Sample SDA at SCL rising edge
-            sda_val = 0
-            for e, st in reversed(sda_transitions):
-                if st <= time:
-                    sda_val = 1 if e == 'rising' else 0
-                    break
-
-            bits.append(sda_val)
-            bit_count += 1
-
-            if bit_count == 8:
-                current_byte = sum([bit << (7 - i) for i, bit in enumerate(bits)])
-                decoded_bytes.append(current_byte)
-                
-                # Convert to ASCII character if printable
-                char_repr = chr(current_byte) if 32 <= current_byte < 127 else '.'
-                output_lines.append(f"{time}µs: I2C byte = 0x{current_byte:02X} ('{char_repr}')")
-                print(f"I2C byte at {time}µs: 0x{current_byte:02X} ('{char_repr}')")
-                bits = []
-                bit_count = 0
+    # via a stabbing query against the sorted high periods
+    start_stops = []
+    if scl_high_starts.size:
+        period = np.searchsorted(scl_high_starts, sda_edge_times, side='right') - 1
+        inside = (period >= 0) & (sda_edge_times <= scl_high_ends[np.maximum(period, 0)])
+        for sda_level, sda_time in zip(sda_edge_levels[inside].tolist(),
+                                       sda_edge_times[inside].tolist()):
+            start_stops.append(('START' if sda_level == 0 else 'STOP', sda_time))
+
+    # Sample SDA at every SCL rising edge and pack into bytes (MSB first)
+    scl_rising_times = scl_edge_times[scl_edge_levels == 1]
+    sda_times, sda_levels = with_idle_state(sda_edge_times, sda_edge_levels, idle_level=0)
+    sda_at_scl = get_levels_at(sda_times, sda_levels, scl_rising_times)
+
+    n_bits = (scl_rising_times.size // 8) * 8
+    byte_times = scl_rising_times[7:n_bits:8]
+    byte_vals = np.packbits(sda_at_scl[:n_bits].reshape(-1, 8), axis=1, bitorder='big').ravel()
+    decoded_bytes = byte_vals.tolist()
+
+    # Keep event timestamps alongside the formatted lines so the final
+    # sort is key-based instead of re-parsing every string
+    event_times = []
+
+    for time, current_byte in zip(byte_times.tolist(), decoded_bytes):
+        # Convert to ASCII character if printable
+        char_repr = chr(current_byte) if 32 <= current_byte < 127 else '.'
+        event_times.append(time)
+        output_lines.append(f"{time}µs: I2C byte = 0x{current_byte:02X} ('{char_repr}')")
+        print(f"I2C byte at {time}µs: 0x{current_byte:02X} ('{char_repr}')")
 
     # Add start/stop conditions to output
     for condition, time in start_stops:
+        event_times.append(time)
         output_lines.append(f"{time}µs: I2C {condition}")
         print(f"I2C {condition} at {time}µs")
 
     # Sort output by time
-    output_lines.sort(key=lambda x: int(x.split('µs:')[0]))
+    order = np.argsort(np.asarray(event_times, dtype=np.int64), kind='stable')
+    output_lines = [output_lines[i] for i in order]
+
+    hex_str, ascii_str = format_bytes(byte_vals)
 
     with open("decoded_i2c_output.txt", "w") as f:
         f.write("=== I2C Decoded Data ===\n")
         for line in output_lines:
             f.write(line + "\n")
         f.write(f"\n=== ASCII Summary ===\n")
-        f.write(f"Hex: {' '.join(f'{b:02X}' for b in decoded_bytes)}\n")
-        f.write(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}\n")
-    
+        f.write(f"Hex: {hex_str}\n")
+        f.write(f"ASCII: {ascii_str}\n")
+
     print(f"\nI2C ASCII Summary:")
-    print(f"Decoded bytes: {' '.join(f'{b:02X}' for b in decoded_bytes)}")
-    print(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}")
+    print(f"Decoded bytes: {hex_str}")
+    print(f"ASCII: {ascii_str}")
     print(f"Decoded I2C output written to 'decoded_i2c_output.txt'")
 
 # ========== MAIN SELECTOR ==========
@@ -1,17 +1,83 @@
+import os
 import serial
-import struct
-import csv
+import queue
+import termios
 import threading
+import time
+import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from collections import defaultdict, deque
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional - decode_batch falls back to NumPy ufuncs
+    njit = None
 
 # ========================
 # Data Structures
 # ========================
 
-channel_data = defaultdict(lambda: deque(maxlen=1000))  # stores (time, edge)
-data_log = []  # stores raw CSV log
+MAX_EVENTS = 1000  # Events retained per channel for plotting
+
+class RingBuf:
+    """Fixed-size event ring backed by packed NumPy arrays
+
+    Holds the newest MAX_EVENTS (time, edge) pairs per channel as two
+    preallocated columns instead of a deque of Python tuples, so the
+    animation can hand zero-copy arrays straight to set_data.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.t = np.empty(n, dtype=np.int64)
+        self.e = np.empty(n, dtype=np.uint8)
+        self.i = 0
+        self.full = False
+
+    def extend(self, times, edges):
+        """Bulk append via slice assignment (two slices when wrapping)"""
+        k = len(times)
+        if k >= self.n:
+            # Only the newest n events survive
+            self.t[:] = times[-self.n:]
+            self.e[:] = edges[-self.n:]
+            self.i = 0
+            self.full = True
+            return
+        end = self.i + k
+        if end <= self.n:
+            self.t[self.i:end] = times
+            self.e[self.i:end] = edges
+        else:
+            split = self.n - self.i
+            self.t[self.i:] = times[:split]
+            self.e[self.i:] = edges[:split]
+            self.t[:end - self.n] = times[split:]
+            self.e[:end - self.n] = edges[split:]
+        if end >= self.n:
+            self.full = True
+        self.i = end % self.n
+
+    def arrays(self):
+        """Events in arrival order; zero-copy slices until the ring wraps"""
+        if self.full:
+            return (np.concatenate((self.t[self.i:], self.t[:self.i])),
+                    np.concatenate((self.e[self.i:], self.e[:self.i])))
+        return self.t[:self.i], self.e[:self.i]
+
+# Channel ids are 2 bits on the wire, so plain 4-entry lists beat dict
+# hashing on the per-batch hot paths
+channel_data = [RingBuf(MAX_EVENTS) for _ in range(4)]
+
+# Per-channel dirty bits: decode sets one when it appends events, the
+# render loop only rebuilds artists for channels that actually changed
+_dirty = [False] * 4
+
+# Fixed-size per-channel plot arrays handed to set_data every frame: the
+# live prefix holds the step waveform and the tail stays NaN (matplotlib
+# skips NaNs), so the Line2D data never changes size or reallocates
+_PLOT_POINTS = 2 * MAX_EVENTS  # step waveform peaks at 2 points per event
+_plot_x = [np.full(_PLOT_POINTS, np.nan) for _ in range(4)]
+_plot_y = [np.full(_PLOT_POINTS, np.nan) for _ in range(4)]
 
 # ========================
 # User Setup Phase
@@ -43,47 +109,118 @@ def get_channel_mapping(comm_type):
 # USB Handler
 # ========================
 
-def decode_usb_packet(packet_bytes):
-    if len(packet_bytes) != 4:
-        return None
-    data, = struct.unpack('<I', packet_bytes)
-    edge = (data >> 31) & 0x1
-    channel = (data >> 29) & 0x3
-    time = data & 0x1FFFFFFF
-    return edge, channel, time
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _decode_events(data, edges, channels, times):
+        # One pass over the packet words, with the GIL released so the
+        # render thread keeps running while a burst is decoded
+        for i in range(data.size):
+            word = data[i]
+            edges[i] = word >> 31
+            channels[i] = (word >> 29) & 0x3
+            times[i] = word & 0x1FFFFFFF
+
+def decode_batch(buf):
+    """Decode a whole run of 4-byte packets into (edges, channels, times)
+
+    The only packet decoder: the nogil numba kernel when available
+    (single memory pass), otherwise three NumPy ufunc passes, which
+    also release the GIL.
+    """
+    data = np.frombuffer(buf, dtype='<u4')
+    if njit is not None:
+        edges = np.empty(data.size, dtype=np.uint8)
+        channels = np.empty(data.size, dtype=np.uint8)
+        times = np.empty(data.size, dtype=np.int64)
+        _decode_events(data, edges, channels, times)
+        return edges, channels, times
+    edges = (data >> 31).astype(np.uint8)
+    channels = ((data >> 29) & 0x3).astype(np.uint8)
+    times = (data & 0x1FFFFFFF).astype(np.int64)
+    return edges, channels, times
 
 # ========================
 # Real-Time Update Func
 # ========================
 
+class BlitManager:
+    """Draw the figure once, then blit only the animated artists
+
+    Standard matplotlib blitting pattern: the static background (axes,
+    ticks, titles) is snapshotted after a full draw and each frame is
+    restore-background + draw_artist + blit. The draw_event hook
+    re-snapshots whenever something static changes and the canvas does a
+    full draw.
+    """
+    def __init__(self, canvas, animated_artists=()):
+        self.canvas = canvas
+        self._background = None
+        self._artists = list(animated_artists)
+        for artist in self._artists:
+            artist.set_animated(True)
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        if event is not None and event.canvas is not self.canvas:
+            return
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self._artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def update(self):
+        if self._background is None:
+            self._on_draw(None)
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
 def update_plot(frame):
-    for ch, line in lines.items():
-        if channel_data[ch]:
-            raw_times, raw_edges = zip(*channel_data[ch])
-            
-            # Create step-wise waveform: duplicate each time, except the last
-            times = []
-            edges = []
-            for i in range(len(raw_times)):
-                times.append(raw_times[i])
-                edges.append(raw_edges[i])
-                if i < len(raw_times) - 1:
-                    times.append(raw_times[i + 1])
-                    edges.append(raw_edges[i])  # Hold current level until next edge
-            
-            line.set_data(times, edges)
+    for ch in range(4):
+        line = lines[ch]
+        if line is None or not _dirty[ch]:
+            continue
+        _dirty[ch] = False
+        raw_times, raw_edges = channel_data[ch].arrays()
+        if raw_times.size:
+            # Create step-wise waveform: each level holds until the next
+            # edge, which is two np.repeat views instead of a per-point
+            # append loop
+            times = np.repeat(raw_times, 2)[1:]
+            edges = np.repeat(raw_edges, 2)[:-1]
             ax = line.axes
-            
+
+            # Decimate to the pixel budget: anything beyond ~2 points per
+            # horizontal pixel cannot produce visible change, so cap what
+            # the renderer has to walk each frame
+            point_budget = max(2 * int(ax.bbox.width), 2)
+            if times.size > point_budget:
+                keep = np.linspace(0, times.size - 1, point_budget).astype(int)
+                times = times[keep]
+                edges = edges[keep]
+
+            # Copy into the channel's preallocated arrays and NaN the
+            # tail; set_data always sees the same fixed-size buffers
+            x, y = _plot_x[ch], _plot_y[ch]
+            k = times.size
+            x[:k] = times
+            y[:k] = edges
+            x[k:] = np.nan
+            y[k:] = np.nan
+            line.set_data(x, y)
+
             # Fix the x-axis scaling issue
             if len(times) > 0:
                 if len(times) > 1:
-                    # Detect current byte by finding the largest time gap (>1000 units indicates new byte)
-                    current_byte_start = 0
-                    for i in range(len(raw_times) - 1, 0, -1):
-                        if raw_times[i] - raw_times[i-1] > 1000:  # Gap indicates new byte
-                            current_byte_start = i
-                            break
-                    
+                    # Detect current byte by finding the last time gap (>1000 units indicates new byte)
+                    gap_idx = np.flatnonzero(np.diff(raw_times) > 1000)
+                    current_byte_start = gap_idx[-1] + 1 if gap_idx.size else 0
+
+
                     # Extract times for current byte only
                     current_byte_times = raw_times[current_byte_start:]
                     
@@ -104,7 +241,7 @@ def update_plot(frame):
                     # Single point total
                     ax.set_xlim(times[0] - 750, times[0] + 750)
 
-    return list(lines.values())
+    return [line for line in lines if line is not None]
 
 # ========================
 # Main Function
@@ -122,7 +259,7 @@ def main():
     if num_channels == 1:
         axes = [axes]  # ensure it's iterable
 
-    lines = {}
+    lines = [None] * 4
 
     # Create a mapping from channel index to name for subplot labels
     channel_names = {ch: mapping[ch] for ch in mapping}
@@ -139,26 +276,142 @@ def main():
 
     ser = serial.Serial('/dev/tty.usbmodem385A439452311', 115200)  # Change to correct port if needed
 
-    with open("bitlog.csv", "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Channel-Type", "Edge", "Time"])
+    with open("bitlog.csv", "w", newline='', buffering=1 << 20) as f:
+        f.write("Channel-Type,Edge,Time\r\n")
+
+        # Every field except the timestamp comes from a tiny enumerated
+        # set, so each row is a precomputed "name,label," prefix plus the
+        # time - no csv.writer quoting logic per event
+        row_prefix = [[f"{mapping.get(ch)},falling,", f"{mapping.get(ch)},rising,"]
+                      for ch in range(4)]
+
+        chunk_queue = queue.Queue()
+        row_queue = queue.Queue(maxsize=1024)  # formatted CSV batches
+        data_ready = threading.Event()
 
         def read_serial():
+            # Only the GIL-releasing bulk read lives on this thread, so
+            # capture never waits on decode, CSV or the render loop.
+            # Reads go through os.read on the raw fd - one C syscall per
+            # burst with none of pyserial's per-call Python wrapper -
+            # with VMIN/VTIME making each read block until at least one
+            # whole packet (or a 100 ms lull) arrives.
+            #
+            # A single blocking reader is deliberate: with one fd and the
+            # kernel's tty buffer soaking up bursts, an async event loop
+            # (pyserial-asyncio) or batched submission ring would add a
+            # dependency and a second scheduler without reducing the one
+            # read syscall per burst this loop already makes. Revisit only
+            # if multiple capture devices need multiplexing.
+            fd = ser.fileno()
+            try:
+                attrs = termios.tcgetattr(fd)
+                attrs[6][termios.VMIN] = 4
+                attrs[6][termios.VTIME] = 1
+                termios.tcsetattr(fd, termios.TCSANOW, attrs)
+            except termios.error:
+                pass  # not a tty on this platform; os.read still works
+            while True:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    # EOF: the device disconnected, and retrying would
+                    # spin on empty reads. End capture like the old
+                    # blocking ser.read did on SerialException.
+                    break
+                chunk_queue.put(chunk)
+
+        def decode_serial():
+            # Drain whole bursts from the queue and decode them in batches
+            buffer = bytearray()
             while True:
-                packet = ser.read(4)
-                decoded = decode_usb_packet(packet)
-                if decoded:
-                    edge, channel, time = decoded
-                    channel_name = mapping.get(channel)
-                    channel_data[channel].append((time, edge))
-                    edge_label = "rising" if edge else "falling"
-                    writer.writerow([channel_name, edge_label, time])
-                    f.flush()  # Ensure data is written to file immediately
-
-        thread = threading.Thread(target=read_serial, daemon=True)
-        thread.start()
-
-        ani = animation.FuncAnimation(fig, update_plot, interval=100)
+                buffer.extend(chunk_queue.get())
+                while True:
+                    try:
+                        buffer.extend(chunk_queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                n_packets = len(buffer) // 4
+                if not n_packets:
+                    continue
+
+                # Decode every complete packet at once
+                edges, channels, times = decode_batch(bytes(buffer[:n_packets * 4]))
+                del buffer[:n_packets * 4]
+
+                # Fan events out to the per-channel plot buffers
+                for ch in range(4):
+                    mask = channels == ch
+                    if mask.any():
+                        channel_data[ch].extend(times[mask], edges[mask])
+                        _dirty[ch] = True
+
+                # Hand the formatted batch to the writer thread; a slow
+                # disk drops the oldest pending batch instead of
+                # stalling decode behind file I/O
+                rows = ''.join(
+                    [f"{row_prefix[ch][edge]}{t}\r\n"
+                     for ch, edge, t in zip(channels.tolist(), edges.tolist(),
+                                            times.tolist())])
+                try:
+                    row_queue.put_nowait(rows)
+                except queue.Full:
+                    try:
+                        row_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    row_queue.put_nowait(rows)
+
+                data_ready.set()
+
+        def write_log():
+            # Dedicated log writer: drain every queued batch in one
+            # write, let the 1 MiB file buffer soak up the rows and
+            # only force them out every ~100 ms
+            last_flush = time.monotonic()
+            while True:
+                batches = [row_queue.get()]
+                while True:
+                    try:
+                        batches.append(row_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                f.write(''.join(batches))
+
+                now = time.monotonic()
+                if now - last_flush >= 0.1:
+                    f.flush()
+                    last_flush = now
+
+        threading.Thread(target=read_serial, daemon=True).start()
+        threading.Thread(target=decode_serial, daemon=True).start()
+        threading.Thread(target=write_log, daemon=True).start()
+
+        # Manual blit manager instead of FuncAnimation: the figure is
+        # drawn once and each tick only restores the cached background
+        # and redraws the Line2D artists
+        blit_manager = BlitManager(fig.canvas,
+                                   [line for line in lines if line is not None])
+
+        def on_timer():
+            # Skip the frame entirely when no batch has arrived since the
+            # last tick - an idle capture costs no set_data or blit work
+            if not data_ready.is_set():
+                return
+            data_ready.clear()
+
+            previous_limits = [ax.get_xlim() for ax in axes]
+            update_plot(None)
+            if any(ax.get_xlim() != lim for ax, lim in zip(axes, previous_limits)):
+                # Axis limits moved: the cached background is stale, so a
+                # full draw (which re-snapshots it) is needed this frame
+                fig.canvas.draw_idle()
+            else:
+                blit_manager.update()
+
+        timer = fig.canvas.new_timer(interval=100)
+        timer.add_callback(on_timer)
+        timer.start()
         plt.show()
 
 if __name__ == "__main__":
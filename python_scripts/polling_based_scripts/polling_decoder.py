@@ -1,7 +1,33 @@
-import csv
+"""Protocol decoders for continuously sampled (polling-based) captures.
+
+Samples are kept in struct-of-arrays form: channel_data maps each channel
+name to a (timestamps, levels) pair, where timestamps is an int64 array of
+CPU cycle counts shared between channels and levels is that channel's int8
+sample array. Packed columns keep a multi-million-sample capture in tens
+of MB instead of hundreds and let the decoders work on whole arrays.
+"""
+import mmap
 import sys
-from collections import defaultdict
 import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pac
+except ImportError:
+    # PyArrow is optional - ingest falls back to the pandas C parser
+    pa = None
+    pac = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # Numba is optional - decoding still works, just without the JIT speedup
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+    prange = range
 
 # CPU frequency for STM32F103 (72 MHz)
 CPU_FREQ_HZ = 72_000_000
@@ -10,75 +36,150 @@ def cycles_to_microseconds(cycles):
     """Convert CPU cycles to microseconds"""
     return cycles / CPU_FREQ_HZ * 1_000_000
 
+# Translation table mapping unprintable byte values to '.'
+_PRINTABLE = bytes(b if 32 <= b < 127 else 0x2E for b in range(256))
+
+def format_bytes(byte_vals):
+    """Render decoded bytes as (hex, ascii) strings in two C-level passes"""
+    data = bytes(byte_vals)
+    return data.hex(' ').upper(), data.translate(_PRINTABLE).decode('ascii')
+
 def load_csv_data(filepath):
-    """Load CSV data and return channel data with cycle timestamps"""
-    channel_data = {}
-    
+    """Load CSV data and return per-channel (timestamps, levels) arrays
+
+    Prefers the multithreaded PyArrow CSV reader, which tokenizes and
+    converts in parallel straight into typed columnar buffers; falls
+    back to the pandas C parser when pyarrow is not installed. See the
+    module docstring for the struct-of-arrays layout of the returned
+    dict.
+    """
     try:
-        with open(filepath, 'r', newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            header = next(reader)
-            print(f"CSV header: {header}")
-            
-            # Parse header to find channel columns
-            time_col = 0  # First column is time
-            channel_cols = {}
-            for i, col_name in enumerate(header[1:], 1):  # Skip time column
-                channel_cols[col_name] = i
-                channel_data[col_name] = []
-            
-            # Read data
-            for row in reader:
-                if len(row) != len(header):
-                    continue
-                    
-                try:
-                    timestamp = int(row[time_col])
-                except ValueError:
-                    continue
-                
-                # Store (timestamp, level) for each channel
-                for channel_name, col_idx in channel_cols.items():
-                    try:
-                        level = int(row[col_idx])
-                        channel_data[channel_name].append((timestamp, level))
-                    except (ValueError, IndexError):
-                        continue
-                        
+        if pac is not None:
+            return _load_csv_arrow(filepath)
+        return _load_csv_pandas(filepath)
     except FileNotFoundError:
         print(f"Error: File '{filepath}' not found")
         return None
     except Exception as e:
         print(f"Error reading file: {e}")
         return None
-    
+
+def _load_csv_arrow(filepath):
+    """PyArrow ingest path: parallel parse into typed columns"""
+    with open(filepath, 'rb') as f:
+        # The py_buffer exports a pointer into the mapping, so the mmap is
+        # left to close with its last reference rather than eagerly
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        table = pac.read_csv(
+            pa.py_buffer(mm),
+            read_options=pac.ReadOptions(block_size=8 << 20),
+            # Interrupted captures normally end in a partial row (the
+            # logger flushes on a timer), so skip short rows like the
+            # row-by-row parser did
+            parse_options=pac.ParseOptions(
+                invalid_row_handler=lambda row: 'skip')).combine_chunks()
+
+    header = table.column_names
+    print(f"CSV header: {header}")
+    if table.num_rows == 0:
+        raise ValueError(f"no data in '{filepath}'")
+
+    # Mirror the old per-row int() guard: a non-numeric field makes
+    # Arrow infer the whole column as strings, so coerce per column and
+    # drop the offending rows instead of casting garbage into the int8
+    # matrix
+    columns = {}
+    valid = np.ones(table.num_rows, dtype=bool)
+    for name in header:
+        col = table.column(name)
+        if pa.types.is_integer(col.type) and col.null_count == 0:
+            columns[name] = col.to_numpy()
+        else:
+            vals = pd.to_numeric(col.to_pandas(), errors='coerce').to_numpy(np.float64)
+            valid &= ~np.isnan(vals)
+            columns[name] = vals
+    if not valid.all():
+        columns = {name: vals[valid] for name, vals in columns.items()}
+
+    # First column is time, the rest are channel columns
+    timestamps = columns[header[0]].astype(np.int64, copy=False)
+    levels_matrix = np.empty((timestamps.size, len(header) - 1), dtype=np.int8)
+    channel_data = {}
+    for j, col_name in enumerate(header[1:]):
+        levels_matrix[:, j] = columns[col_name]
+        channel_data[col_name] = (timestamps, levels_matrix[:, j])
+    return channel_data
+
+def _load_csv_pandas(filepath):
+    """Fallback ingest via the pandas C parser
+
+    The capture is memory-mapped so the parser reads straight from the
+    page cache instead of through buffered-I/O copies, and parsed in
+    bounded chunks so peak memory holds packed columns, never a whole
+    capture's DataFrame plus parser intermediates.
+    """
+    header = None
+    time_chunks = []
+    level_chunks = {}
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for chunk in pd.read_csv(mm, engine='c', chunksize=1_000_000):
+                if header is None:
+                    header = list(chunk.columns)
+                    print(f"CSV header: {header}")
+                    level_chunks = {col: [] for col in header[1:]}
+                # Same bad-row tolerance as the arrow path: a torn or
+                # garbage row shows up as a non-integer column, so
+                # coerce and drop those rows off the clean fast path
+                if not all(pd.api.types.is_integer_dtype(chunk[col])
+                           for col in header):
+                    chunk = chunk.apply(pd.to_numeric, errors='coerce').dropna()
+                # First column is time, the rest are channel columns
+                time_chunks.append(chunk[header[0]].to_numpy(np.int64))
+                for col_name in header[1:]:
+                    level_chunks[col_name].append(chunk[col_name].to_numpy(np.int8))
+
+    if header is None:
+        raise ValueError(f"no data in '{filepath}'")
+
+    timestamps = time_chunks[0] if len(time_chunks) == 1 else np.concatenate(time_chunks)
+
+    # All channel levels live in one [sample, channel] matrix - two
+    # large allocations for the whole capture instead of one array
+    # per channel. Each dict entry is a zero-copy column view, so
+    # the per-channel API is unchanged.
+    levels_matrix = np.empty((timestamps.size, len(header) - 1), dtype=np.int8)
+    channel_data = {}
+    for j, col_name in enumerate(header[1:]):
+        pos = 0
+        for chunk_levels in level_chunks[col_name]:
+            levels_matrix[pos:pos + chunk_levels.size, j] = chunk_levels
+            pos += chunk_levels.size
+        channel_data[col_name] = (timestamps, levels_matrix[:, j])
+
     return channel_data
 
 def calculate_actual_sampling_rate(channel_data):
     """Calculate actual sampling rate from timestamp differences"""
     # Use the first channel to analyze timing
-    first_channel = next(iter(channel_data.values()))
-    
-    if len(first_channel) < 100:
+    timestamps, _ = next(iter(channel_data.values()))
+
+    if timestamps.size < 100:
         print("Warning: Not enough samples to accurately determine sampling rate")
         return None
-    
-    # Calculate time differences between consecutive samples
-    time_diffs = []
-    for i in range(1, min(1000, len(first_channel))):  # Use first 1000 samples
-        time_diff = first_channel[i][0] - first_channel[i-1][0]
-        if time_diff > 0:  # Only positive differences
-            time_diffs.append(time_diff)
-    
-    if not time_diffs:
+
+    # Time differences between consecutive samples (first 1000 samples,
+    # positive differences only)
+    time_diffs = np.diff(timestamps[:min(1000, timestamps.size)])
+    time_diffs = time_diffs[time_diffs > 0]
+
+    if time_diffs.size == 0:
         return None
-    
+
     # Calculate statistics
-    avg_cycles_per_sample = np.mean(time_diffs)
-    std_cycles_per_sample = np.std(time_diffs)
-    
-    # Assuming 72 MHz CPU frequency
-    CPU_FREQ_HZ = 72_000_000
+    avg_cycles_per_sample = time_diffs.mean()
+    std_cycles_per_sample = time_diffs.std()
+
     actual_sampling_rate = CPU_FREQ_HZ / avg_cycles_per_sample
     
     print(f"Sampling Analysis:")
@@ -89,35 +190,90 @@ def calculate_actual_sampling_rate(channel_data):
     
     return actual_sampling_rate, avg_cycles_per_sample
 
-def find_edges(samples):
-    """Convert continuous samples to edge transitions"""
-    edges = []
-    if not samples:
-        return edges
-    
-    prev_level = samples[0][1]
-    for timestamp, level in samples[1:]:
-        if level != prev_level:
-            edge_type = 'rising' if level > prev_level else 'falling'
-            edges.append((edge_type, timestamp))
-            prev_level = level
-    
-    return edges
+def find_edges(timestamps, levels):
+    """Convert continuous samples to edge transitions
+
+    Returns (edge_times, edge_polarity) arrays: polarity is the signed
+    level delta at each edge, so > 0 means rising and < 0 means falling.
+    The whole comparison runs as one np.diff instead of a per-sample
+    Python loop.
+    """
+    if timestamps.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+
+    delta = np.diff(levels.astype(np.int8))
+    edge_idx = np.flatnonzero(delta)
+    return timestamps[edge_idx + 1], delta[edge_idx]
 
-def get_level_at_time(samples, target_time):
-    """Get signal level at a specific time from continuous samples"""
-    if not samples:
+def get_level_at_time(timestamps, levels, target_time):
+    """Get signal level at a specific time from continuous samples
+
+    Timestamps are monotonic, so binary search replaces the linear scan.
+    """
+    if timestamps.size == 0:
         return 0
-    
-    # Find the sample at or before target_time
-    for i, (timestamp, level) in enumerate(samples):
-        if timestamp > target_time:
-            if i == 0:
-                return samples[0][1]
-            return samples[i-1][1]
-    
-    # If target_time is after all samples, return last level
-    return samples[-1][1]
+
+    # Index of the sample at or before target_time (clamped to the ends)
+    idx = np.searchsorted(timestamps, target_time, side='right') - 1
+    return int(levels[max(idx, 0)])
+
+def get_levels_at(timestamps, levels, target_times):
+    """Batched get_level_at_time: one searchsorted call for all lookups"""
+    idx = np.searchsorted(timestamps, target_times, side='right') - 1
+    return levels[np.maximum(idx, 0)]
+
+@njit(cache=True, parallel=True)
+def _uart_core(timestamps, levels, frame_starts, bit_offsets, parity_offset,
+               stop_offset, parity_mode):
+    """Sample and assemble every UART frame in one compiled pass
+
+    parity_mode: 0 = none, 1 = even, 2 = odd. Returns the byte values,
+    the raw bit matrix (for frame reporting), per-frame parity results
+    and the sampled stop-bit levels. Frames are independent, so the
+    outer loop runs as a prange across cores on long captures.
+    """
+    n_frames = frame_starts.size
+    data_bits = bit_offsets.size
+    byte_values = np.empty(n_frames, dtype=np.uint8)
+    bit_matrix = np.empty((n_frames, data_bits), dtype=np.uint8)
+    parity_ok = np.ones(n_frames, dtype=np.bool_)
+    stop_bit_levels = np.empty(n_frames, dtype=np.uint8)
+
+    for i in prange(n_frames):
+        start = frame_starts[i]
+        value = np.uint32(0)
+        ones = np.uint32(0)
+        for k in range(data_bits):
+            idx = np.searchsorted(timestamps, start + bit_offsets[k], side='right') - 1
+            if idx < 0:
+                idx = 0
+            bit = np.uint32(levels[idx])
+            bit_matrix[i, k] = bit
+            value |= bit << k
+            ones ^= bit
+        byte_values[i] = value
+
+        if parity_mode != 0:
+            idx = np.searchsorted(timestamps, start + parity_offset, side='right') - 1
+            if idx < 0:
+                idx = 0
+            parity_bit = np.uint32(levels[idx])
+            if parity_mode == 1:  # even
+                parity_ok[i] = ones == np.uint32(1) - parity_bit
+            else:  # odd
+                parity_ok[i] = ones == parity_bit
+
+        idx = np.searchsorted(timestamps, start + stop_offset, side='right') - 1
+        if idx < 0:
+            idx = 0
+        stop_bit_levels[i] = levels[idx]
+
+    return byte_values, bit_matrix, parity_ok, stop_bit_levels
+
+def _pack_bytes_msb(bits):
+    """Pack an MSB-first bit array into bytes (trailing partial discarded)"""
+    n_bits = (bits.size // 8) * 8
+    return np.packbits(bits[:n_bits].astype(np.uint8).reshape(-1, 8), axis=1).ravel()
 
 # ========== UART DECODER ==========
 def decode_uart_polling(channel_data, channel_name, baud_rate, data_bits=8, parity='N', stop_bits=1):
@@ -135,99 +291,80 @@ def decode_uart_polling(channel_data, channel_name, baud_rate, data_bits=8, pari
     
     actual_sampling_rate, avg_cycles_per_sample = sampling_info
     
-    samples = channel_data[channel_name]
-    
+    timestamps, levels = channel_data[channel_name]
+
     # Calculate bit time in CPU cycles and samples
-    CPU_FREQ_HZ = 72_000_000
     bit_time_cycles = CPU_FREQ_HZ / baud_rate
     bit_time_samples = bit_time_cycles / avg_cycles_per_sample
-    
+
     print(f"\nDecoding UART on {channel_name}")
     print(f"Baud rate: {baud_rate}")
-    print(f"Theoretical bit time: {bit_time_cycles:.0f} cycles ({bit_time_cycles/CPU_FREQ_HZ*1000000:.1f}µs)")
+    print(f"Theoretical bit time: {bit_time_cycles:.0f} cycles ({cycles_to_microseconds(bit_time_cycles):.1f}µs)")
     print(f"Bit time in samples: {bit_time_samples:.2f} samples")
     
     # Find edges for frame detection
-    edges = find_edges(samples)
-    
-    # Detect UART frames (look for falling edges that could be start bits)
-    frame_starts = []
+    edge_times, edge_polarity = find_edges(timestamps, levels)
+
+    # Detect UART frames (look for falling edges that could be start bits).
+    # All candidates are checked at once: the idle gap before each falling
+    # edge comes from the edge-time differences, and "next rising edge
+    # after this falling edge" is a searchsorted into the rising indices.
     min_idle_time_samples = bit_time_samples * 0.8
-    
-    for i, (edge_type, timestamp) in enumerate(edges):
-        if edge_type == 'falling':
-            # Check if line was idle before this
-            if i == 0:
-                frame_starts.append(timestamp)
-            else:
-                # Check time since last edge
-                time_since_last = timestamp - edges[i-1][1]
-                samples_since_last = time_since_last / avg_cycles_per_sample
-                
-                if samples_since_last > min_idle_time_samples:
-                    # Verify it's a valid start bit
-                    next_rising = None
-                    for j in range(i+1, len(edges)):
-                        if edges[j][0] == 'rising':
-                            next_rising = edges[j][1]
-                            break
-                    
-                    if next_rising:
-                        start_bit_duration = (next_rising - timestamp) / avg_cycles_per_sample
-                        if start_bit_duration >= bit_time_samples * 0.5:
-                            frame_starts.append(timestamp)
+    falling_idx = np.flatnonzero(edge_polarity < 0)
+    rising_idx = np.flatnonzero(edge_polarity > 0)
+
+    if falling_idx.size == 0:
+        frame_starts = np.empty(0, dtype=np.int64)
+    else:
+        # Samples of idle line since the previous edge
+        prev_gap = edge_times[falling_idx] - edge_times[np.maximum(falling_idx - 1, 0)]
+        idle_before = (prev_gap / avg_cycles_per_sample) > min_idle_time_samples
+
+        # Verify each candidate holds low for at least half a bit
+        if rising_idx.size:
+            pos = np.searchsorted(rising_idx, falling_idx)
+            has_rising = pos < rising_idx.size
+            next_rising = edge_times[rising_idx[np.minimum(pos, rising_idx.size - 1)]]
+            start_duration = (next_rising - edge_times[falling_idx]) / avg_cycles_per_sample
+            valid = idle_before & has_rising & (start_duration >= bit_time_samples * 0.5)
+        else:
+            valid = np.zeros(falling_idx.size, dtype=bool)
+
+        # The very first edge has no history: accept it as-is
+        valid |= falling_idx == 0
+        frame_starts = edge_times[falling_idx[valid]]
     
     print(f"Found {len(frame_starts)} potential UART frames")
     
-    # Decode each frame
-    decoded_bytes = []
-    for start_time in frame_starts:
-        try:
-            # Sample data bits at bit centers
-            bits = []
-            for bit_index in range(data_bits):
-                # Sample at 1.5 bit times + bit_index * bit_time from start
-                sample_time = start_time + int(avg_cycles_per_sample * bit_time_samples * (1.5 + bit_index))
-                bit_value = get_level_at_time(samples, sample_time)
-                bits.append(bit_value)
-            
-            # Handle parity if enabled
-            parity_ok = True
-            if parity.upper() in ('E', 'O'):
-                parity_sample_time = start_time + int(avg_cycles_per_sample * bit_time_samples * (1.5 + data_bits))
-                parity_bit = get_level_at_time(samples, parity_sample_time)
-                
-                data_ones = sum(bits)
-                if parity.upper() == 'E':
-                    parity_ok = (data_ones % 2) == (1 - parity_bit)
-                else:
-                    parity_ok = (data_ones % 2) == parity_bit
-            
-            # Check stop bit
-            stop_bit_offset = 1.5 + data_bits + (1 if parity != 'N' else 0)
-            stop_sample_time = start_time + int(avg_cycles_per_sample * bit_time_samples * stop_bit_offset)
-            stop_bit = get_level_at_time(samples, stop_sample_time)
-            
-            # Compose byte (LSB first for UART)
-            byte_value = 0
-            for idx, bit_val in enumerate(bits):
-                byte_value |= (bit_val << idx)
-            
+    # Decode all frames at once: build the full matrix of bit-center
+    # sample times, then one searchsorted fetches every level.
+    decoded_bytes = bytearray()
+    if frame_starts.size:
+        cycles_per_bit = avg_cycles_per_sample * bit_time_samples
+        bit_offsets = (cycles_per_bit * (1.5 + np.arange(data_bits))).astype(np.int64)
+        parity_mode = {'E': 1, 'O': 2}.get(parity.upper(), 0)
+        parity_offset = int(cycles_per_bit * (1.5 + data_bits))
+        stop_bit_offset = 1.5 + data_bits + (1 if parity != 'N' else 0)
+        stop_offset = int(cycles_per_bit * stop_bit_offset)
+
+        byte_values, bit_matrix, parity_ok, stop_bit_levels = _uart_core(
+            timestamps, levels, frame_starts, bit_offsets, parity_offset,
+            stop_offset, parity_mode)
+
+        for frame_idx, start_time in enumerate(frame_starts.tolist()):
+            byte_value = int(byte_values[frame_idx])
             decoded_bytes.append(byte_value)
-            
+
             # Report timing info for first few frames
             if len(decoded_bytes) <= 3:
-                start_time_us = start_time / CPU_FREQ_HZ * 1000000
-                print(f"  Frame {len(decoded_bytes)}: Start at {start_time_us:.1f}µs, Byte: 0x{byte_value:02X} ('{chr(byte_value) if 32 <= byte_value < 127 else '.'}')")
-                print(f"    Bits: {' '.join(str(b) for b in bits)}")
-            
-            if not parity_ok:
-                print(f"  WARNING: Parity error at {start_time/CPU_FREQ_HZ*1000000:.1f}µs")
-            if stop_bit != 1:
-                print(f"  WARNING: Stop bit error at {start_time/CPU_FREQ_HZ*1000000:.1f}µs")
-                
-        except Exception as e:
-            print(f"Error decoding frame at {start_time/CPU_FREQ_HZ*1000000:.1f}µs: {e}")
+                start_time_us = cycles_to_microseconds(start_time)
+                print(f"  Frame {len(decoded_bytes)}: Start at {start_time_us:.1f}µs, Byte: 0x{byte_value:02X} ('{chr(_PRINTABLE[byte_value])}')")
+                print(f"    Bits: {' '.join(str(b) for b in bit_matrix[frame_idx].tolist())}")
+
+            if not parity_ok[frame_idx]:
+                print(f"  WARNING: Parity error at {cycles_to_microseconds(start_time):.1f}µs")
+            if stop_bit_levels[frame_idx] != 1:
+                print(f"  WARNING: Stop bit error at {cycles_to_microseconds(start_time):.1f}µs")
     
     # Output results
     print(f"\n{'='*50}")
@@ -239,9 +376,10 @@ def decode_uart_polling(channel_data, channel_name, baud_rate, data_bits=8, pari
     print(f"  Actual sampling rate: {actual_sampling_rate:.0f} Hz")
     print(f"  Bit time: {bit_time_samples:.2f} samples")
     print(f"")
+    hex_str, ascii_str = format_bytes(decoded_bytes)
     print(f"Decoded {len(decoded_bytes)} bytes:")
-    print(f"Hex:   {' '.join(f'{b:02X}' for b in decoded_bytes)}")
-    print(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}")
+    print(f"Hex:   {hex_str}")
+    print(f"ASCII: {ascii_str}")
     
     # Save results
     output_file = f"{channel_name}_uart_decoded.txt"
@@ -251,8 +389,8 @@ def decode_uart_polling(channel_data, channel_name, baud_rate, data_bits=8, pari
         f.write(f"Actual sampling rate: {actual_sampling_rate:.0f} Hz\n")
         f.write(f"Bit time: {bit_time_samples:.2f} samples\n")
         f.write("=" * 50 + "\n")
-        f.write(f"Hex:   {' '.join(f'{b:02X}' for b in decoded_bytes)}\n")
-        f.write(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}\n")
+        f.write(f"Hex:   {hex_str}\n")
+        f.write(f"ASCII: {ascii_str}\n")
     
     print(f"Results saved to: {output_file}")
 
@@ -266,57 +404,50 @@ def decode_spi_polling(channel_data, clk_channel, mosi_channel, miso_channel, cl
             print(f"Channel {ch} not found in data")
             return
     
-    clk_samples = channel_data[clk_channel]
-    mosi_samples = channel_data[mosi_channel]
-    miso_samples = channel_data[miso_channel]
+    clk_times, clk_levels = channel_data[clk_channel]
+    mosi_times, mosi_levels = channel_data[mosi_channel]
+    miso_times, miso_levels = channel_data[miso_channel]
     
     print(f"Decoding SPI: CLK={clk_channel}, MOSI={mosi_channel}, MISO={miso_channel}")
     print(f"Clock polarity: {clock_polarity}, Clock phase: {clock_phase}")
     
     # Find clock edges
-    clk_edges = find_edges(clk_samples)
-    
+    clk_edge_times, clk_edge_polarity = find_edges(clk_times, clk_levels)
+
     # Determine sampling edge
     if clock_polarity == 0:
-        sample_edge = 'rising' if clock_phase == 0 else 'falling'
+        sample_on_rising = (clock_phase == 0)
     else:
-        sample_edge = 'falling' if clock_phase == 0 else 'rising'
-    
+        sample_on_rising = (clock_phase != 0)
+
     # Find sampling edges
-    sample_times = [timestamp for edge_type, timestamp in clk_edges if edge_type == sample_edge]
-    
+    if sample_on_rising:
+        sample_times = clk_edge_times[clk_edge_polarity > 0]
+    else:
+        sample_times = clk_edge_times[clk_edge_polarity < 0]
+
     print(f"Found {len(sample_times)} sampling edges")
     
-    # Sample data at each clock edge
-    mosi_bytes = []
-    miso_bytes = []
-    current_mosi = 0
-    current_miso = 0
-    bit_count = 0
-    
-    for sample_time in sample_times:
-        mosi_bit = get_level_at_time(mosi_samples, sample_time)
-        miso_bit = get_level_at_time(miso_samples, sample_time)
-        
-        # SPI is MSB first
-        current_mosi = (current_mosi << 1) | mosi_bit
-        current_miso = (current_miso << 1) | miso_bit
-        bit_count += 1
-        
-        if bit_count == 8:
-            mosi_bytes.append(current_mosi)
-            miso_bytes.append(current_miso)
-            print(f"SPI byte at {cycles_to_microseconds(sample_time):.1f}µs: MOSI=0x{current_mosi:02X}, MISO=0x{current_miso:02X}")
-            current_mosi = 0
-            current_miso = 0
-            bit_count = 0
+    # Sample data at each clock edge, then packbits collapses every
+    # group of 8 in one branchless pass (SPI is MSB first)
+    mosi_bits = get_levels_at(mosi_times, mosi_levels, sample_times)
+    miso_bits = get_levels_at(miso_times, miso_levels, sample_times)
+    mosi_bytes = _pack_bytes_msb(mosi_bits)
+    miso_bytes = _pack_bytes_msb(miso_bits)
+
+    # Each byte completes on its 8th sampling edge
+    byte_times = sample_times[7::8][:mosi_bytes.size]
+    for i in range(mosi_bytes.size):
+        print(f"SPI byte at {cycles_to_microseconds(byte_times[i]):.1f}µs: MOSI=0x{mosi_bytes[i]:02X}, MISO=0x{miso_bytes[i]:02X}")
     
     # Output results
+    mosi_hex, mosi_ascii = format_bytes(mosi_bytes)
+    miso_hex, miso_ascii = format_bytes(miso_bytes)
     print(f"\n{'='*20} SPI Results {'='*20}")
-    print(f"MOSI Hex: {' '.join(f'{b:02X}' for b in mosi_bytes)}")
-    print(f"MOSI ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in mosi_bytes)}")
-    print(f"MISO Hex: {' '.join(f'{b:02X}' for b in miso_bytes)}")
-    print(f"MISO ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in miso_bytes)}")
+    print(f"MOSI Hex: {mosi_hex}")
+    print(f"MOSI ASCII: {mosi_ascii}")
+    print(f"MISO Hex: {miso_hex}")
+    print(f"MISO ASCII: {miso_ascii}")
     
     # Save results
     with open("spi_decoded.txt", "w") as f:
@@ -325,10 +456,10 @@ def decode_spi_polling(channel_data, clk_channel, mosi_channel, miso_channel, cl
         f.write(f"Clock polarity: {clock_polarity}, Clock phase: {clock_phase}\n")
         f.write(f"CPU Frequency: {CPU_FREQ_HZ:,} Hz\n")
         f.write("=" * 50 + "\n")
-        f.write(f"MOSI Hex: {' '.join(f'{b:02X}' for b in mosi_bytes)}\n")
-        f.write(f"MOSI ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in mosi_bytes)}\n")
-        f.write(f"MISO Hex: {' '.join(f'{b:02X}' for b in miso_bytes)}\n")
-        f.write(f"MISO ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in miso_bytes)}\n")
+        f.write(f"MOSI Hex: {mosi_hex}\n")
+        f.write(f"MOSI ASCII: {mosi_ascii}\n")
+        f.write(f"MISO Hex: {miso_hex}\n")
+        f.write(f"MISO ASCII: {miso_ascii}\n")
     
     print("Results saved to: spi_decoded.txt")
 
@@ -340,53 +471,46 @@ def decode_i2c_polling(channel_data, scl_channel, sda_channel):
         print(f"Required channels not found in data")
         return
     
-    scl_samples = channel_data[scl_channel]
-    sda_samples = channel_data[sda_channel]
+    scl_times, scl_levels = channel_data[scl_channel]
+    sda_times, sda_levels = channel_data[sda_channel]
     
     print(f"Decoding I2C: SCL={scl_channel}, SDA={sda_channel}")
     
     # Find edges
-    scl_edges = find_edges(scl_samples)
-    sda_edges = find_edges(sda_samples)
-    
+    scl_edge_times, scl_edge_polarity = find_edges(scl_times, scl_levels)
+    sda_edge_times, sda_edge_polarity = find_edges(sda_times, sda_levels)
+
     # Detect start/stop conditions (SDA changes while SCL is high)
     start_stop_conditions = []
-    
-    for edge_type, timestamp in sda_edges:
-        scl_level = get_level_at_time(scl_samples, timestamp)
+
+    for timestamp, polarity in zip(sda_edge_times.tolist(), sda_edge_polarity.tolist()):
+        scl_level = get_level_at_time(scl_times, scl_levels, timestamp)
         if scl_level == 1:  # SCL is high
-            if edge_type == 'falling':
+            if polarity < 0:
                 start_stop_conditions.append(('START', timestamp))
-            elif edge_type == 'rising':
+            else:
                 start_stop_conditions.append(('STOP', timestamp))
-    
+
     # Sample data on SCL rising edges
-    scl_rising_times = [timestamp for edge_type, timestamp in scl_edges if edge_type == 'rising']
-    
-    decoded_bytes = []
-    current_byte = 0
-    bit_count = 0
+    scl_rising_times = scl_edge_times[scl_edge_polarity > 0]
     
-    for sample_time in scl_rising_times:
-        sda_bit = get_level_at_time(sda_samples, sample_time)
-        
-        # I2C is MSB first
-        current_byte = (current_byte << 1) | sda_bit
-        bit_count += 1
-        
-        if bit_count == 8:
-            decoded_bytes.append(current_byte)
-            print(f"I2C byte at {cycles_to_microseconds(sample_time):.1f}µs: 0x{current_byte:02X}")
-            current_byte = 0
-            bit_count = 0
+    # I2C is MSB first; sample SDA at every rising SCL edge and pack
+    # the bits into bytes in one call
+    sda_bits = get_levels_at(sda_times, sda_levels, scl_rising_times)
+    decoded_bytes = _pack_bytes_msb(sda_bits)
+
+    byte_times = scl_rising_times[7::8][:decoded_bytes.size]
+    for i in range(decoded_bytes.size):
+        print(f"I2C byte at {cycles_to_microseconds(byte_times[i]):.1f}µs: 0x{decoded_bytes[i]:02X}")
     
     # Output results
     print(f"\n{'='*20} I2C Results {'='*20}")
     for condition, timestamp in start_stop_conditions:
         print(f"I2C {condition} at {cycles_to_microseconds(timestamp):.1f}µs")
     
-    print(f"Decoded bytes: {' '.join(f'{b:02X}' for b in decoded_bytes)}")
-    print(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}")
+    hex_str, ascii_str = format_bytes(decoded_bytes)
+    print(f"Decoded bytes: {hex_str}")
+    print(f"ASCII: {ascii_str}")
     
     # Save results
     with open("i2c_decoded.txt", "w") as f:
@@ -398,8 +522,8 @@ def decode_i2c_polling(channel_data, scl_channel, sda_channel):
         for condition, timestamp in start_stop_conditions:
             f.write(f"I2C {condition} at {cycles_to_microseconds(timestamp):.1f}µs\n")
         
-        f.write(f"Hex: {' '.join(f'{b:02X}' for b in decoded_bytes)}\n")
-        f.write(f"ASCII: {''.join(chr(b) if 32 <= b < 127 else '.' for b in decoded_bytes)}\n")
+        f.write(f"Hex: {hex_str}\n")
+        f.write(f"ASCII: {ascii_str}\n")
     
     print("Results saved to: i2c_decoded.txt")
 
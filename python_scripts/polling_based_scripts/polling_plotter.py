@@ -2,9 +2,10 @@ import serial
 import struct
 import csv
 import threading
+import time
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import defaultdict, deque
 
 # ========================
 # Config
@@ -13,12 +14,68 @@ SERIAL_PORT = '/dev/tty.usbmodem385A439452311'  # Update as needed
 BAUDRATE = 115200
 SAMPLE_STRUCT = struct.Struct("<IB")  # uint32_t timestamp + uint8_t value
 SAMPLE_SIZE = SAMPLE_STRUCT.size  # 5 bytes per sample
+SAMPLE_DTYPE = np.dtype([('t', '<u4'), ('v', 'u1')])  # same layout for bulk decode
 MAX_SAMPLES = 2500000  # Max samples per channel for plotting (2.5 mill)
+LOG_BATCH_ROWS = 4096  # Samples buffered before the CSV log is flushed
+LOG_FLUSH_INTERVAL_S = 0.1  # Flush at least this often even when idle
 
 # ========================
 # Data Storage
 # ========================
-channel_data = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+class RingBuf:
+    """Fixed-size sample ring backed by packed NumPy arrays
+
+    Replaces the deque-of-tuples storage: two preallocated columns
+    (int64 timestamps, int8 levels) instead of millions of pointer-heavy
+    Python tuples. Pushes are O(1) array stores and reads come back as
+    arrays ready for plotting.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.t = np.empty(n, dtype=np.int64)
+        self.v = np.empty(n, dtype=np.int8)
+        self.i = 0
+        self.full = False
+
+    def push(self, timestamp, level):
+        self.t[self.i] = timestamp
+        self.v[self.i] = level
+        self.i = (self.i + 1) % self.n
+        if self.i == 0:
+            self.full = True
+
+    def extend(self, timestamps, levels):
+        """Bulk push via slice assignment (two slices when wrapping)"""
+        k = len(timestamps)
+        if k >= self.n:
+            # Only the newest n samples survive
+            self.t[:] = timestamps[-self.n:]
+            self.v[:] = levels[-self.n:]
+            self.i = 0
+            self.full = True
+            return
+        end = self.i + k
+        if end <= self.n:
+            self.t[self.i:end] = timestamps
+            self.v[self.i:end] = levels
+        else:
+            split = self.n - self.i
+            self.t[self.i:] = timestamps[:split]
+            self.v[self.i:] = levels[:split]
+            self.t[:end - self.n] = timestamps[split:]
+            self.v[:end - self.n] = levels[split:]
+        if end >= self.n:
+            self.full = True
+        self.i = end % self.n
+
+    def arrays(self):
+        """Samples in arrival order; zero-copy slices until the ring wraps"""
+        if self.full:
+            return (np.concatenate((self.t[self.i:], self.t[:self.i])),
+                    np.concatenate((self.v[self.i:], self.v[:self.i])))
+        return self.t[:self.i], self.v[:self.i]
+
+channel_data = {ch: RingBuf(MAX_SAMPLES) for ch in range(4)}
 prev_levels = {ch: 0 for ch in range(4)}  # previous pin values
 
 # ========================
@@ -65,58 +122,63 @@ def read_usb(mapping):
         writer.writerow(header)
         
         buffer = bytearray()
+        pending_rows = []
+        last_flush = time.monotonic()
         while True:
             chunk = ser.read(256)
             buffer.extend(chunk)
-            
-            while len(buffer) >= SAMPLE_SIZE:
-                raw = buffer[:SAMPLE_SIZE]
-                buffer = buffer[SAMPLE_SIZE:]
-                timestamp, value = SAMPLE_STRUCT.unpack(raw)
-                
-                # Extract all 4 channels
-                levels = [(value >> ch) & 0x1 for ch in range(4)]
-                
+
+            # Decode every complete sample in the buffer at once: one
+            # frombuffer view instead of a struct.unpack per 5 bytes,
+            # and unpackbits splits out all 4 channels in a single call
+            n_samples = len(buffer) // SAMPLE_SIZE
+            if n_samples:
+                arr = np.frombuffer(buffer, dtype=SAMPLE_DTYPE, count=n_samples).copy()
+                del buffer[:n_samples * SAMPLE_SIZE]
+
+                timestamps = arr['t']
+                bits = np.unpackbits(arr['v'][:, None], axis=1, bitorder='little')[:, :4]
+
                 # Append to plot buffers
                 for ch in range(4):
-                    channel_data[ch].append((timestamp, levels[ch]))
-                
-                # Write full line to CSV
-                writer.writerow([timestamp] + levels)
-                f.flush()  # Ensure data is written to file immediately
+                    channel_data[ch].extend(timestamps, bits[:, ch])
+
+                pending_rows.extend(np.column_stack((timestamps, bits)).tolist())
+
+            # Drain the log in batches: one writerows + flush per few
+            # thousand samples instead of a write syscall per sample,
+            # so disk I/O never stalls the read loop
+            now = time.monotonic()
+            if pending_rows and (len(pending_rows) >= LOG_BATCH_ROWS
+                                 or now - last_flush >= LOG_FLUSH_INTERVAL_S):
+                writer.writerows(pending_rows)
+                pending_rows.clear()
+                f.flush()
+                last_flush = now
 
 # ========================
 # Plot Update Function (with step-wise waveform)
 # ========================
 def update_plot(_):
     for ch, line in lines.items():
-        if channel_data[ch]:
-            raw_times, raw_levels = zip(*channel_data[ch])
-            
-            # Create step-wise waveform: duplicate each time, except the last
-            times = []
-            levels = []
-            for i in range(len(raw_times)):
-                times.append(raw_times[i])
-                levels.append(raw_levels[i])
-                if i < len(raw_times) - 1:
-                    times.append(raw_times[i + 1])
-                    levels.append(raw_levels[i])  # Hold current level until next edge
-            
-            line.set_data(times, levels)
+        raw_times, raw_levels = channel_data[ch].arrays()
+        if raw_times.size:
+            # drawstyle='steps-post' already holds each level until the
+            # next sample, so the raw data goes in as-is - no Python
+            # loop duplicating every point per frame
+            line.set_data(raw_times, raw_levels)
             ax = line.axes
-            
+
             # Dynamic x-axis scaling with much larger window
-            if len(times) > 0:
-                if len(times) > 1:
-                    # Show a large window of recent data
-                    latest_time = raw_times[-1]
-                    window_size = 200000  # Much larger window size
-                    
-                    ax.set_xlim(latest_time - window_size, latest_time + window_size/10)
-                else:
-                    # Single point total
-                    ax.set_xlim(times[0] - 25000, times[0] + 25000)
+            if raw_times.size > 1:
+                # Show a large window of recent data
+                latest_time = raw_times[-1]
+                window_size = 200000  # Much larger window size
+
+                ax.set_xlim(latest_time - window_size, latest_time + window_size/10)
+            else:
+                # Single point total
+                ax.set_xlim(raw_times[0] - 25000, raw_times[0] + 25000)
 
     return list(lines.values())
 